@@ -4,10 +4,15 @@ from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_ckeditor import CKEditor
 from flask_bootstrap import Bootstrap5
+from app.view_counter import ViewCounter
 from config import Config
 from hashlib import sha256
 from urllib.parse import urlencode
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Engine
+import click
 import logging
+import sqlite3
 
 # Initialize extensions
 db = SQLAlchemy()
@@ -16,11 +21,60 @@ login_manager = LoginManager()
 ckeditor = CKEditor()
 bootstrap = Bootstrap5()
 login_manager = LoginManager()
+view_counter = ViewCounter()
 def gravatar_url(email, size=100, rating='g', default='retro', force_default=False):
     hash_value = sha256(email.lower().encode('utf-8')).hexdigest()
     query_params = urlencode({'d': default, 's': str(size), 'r': rating, 'f': force_default})
     return f"https://www.gravatar.com/avatar/{hash_value}?{query_params}"
 
+# SQLite ignores foreign keys (and so ON DELETE CASCADE) unless asked per connection.
+# Only switched on once the schema has the cascading comments FK, see below.
+sqlite_foreign_keys = False
+
+def running_db_command():
+    # Migrations rebuild tables in batch mode; with foreign keys on, dropping
+    # the old blog_posts table would cascade-delete every comment.
+    ctx = click.get_current_context(silent=True)
+    while ctx is not None:
+        if ctx.info_name == "db":
+            return True
+        ctx = ctx.parent
+    return False
+
+@event.listens_for(Engine, "connect")
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    if (
+        sqlite_foreign_keys
+        and isinstance(dbapi_connection, sqlite3.Connection)
+        and not running_db_command()
+    ):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+def comments_fk_cascades():
+    return any(
+        fk["constrained_columns"] == ["post_id"]
+        and (fk["options"].get("ondelete") or "").upper() == "CASCADE"
+        for fk in inspect(db.engine).get_foreign_keys("comments")
+    )
+
+def configure_sqlite_foreign_keys(app):
+    # Enforcing the baseline (non-cascading) FK would make post deletes fail,
+    # so wait until `flask db upgrade` has added ON DELETE CASCADE.
+    global sqlite_foreign_keys
+    if db.engine.dialect.name != "sqlite":
+        return
+    if comments_fk_cascades():
+        sqlite_foreign_keys = True
+        # Pooled connections were opened without the pragma
+        db.engine.dispose()
+    else:
+        app.logger.warning(
+            "comments.post_id has no ON DELETE CASCADE yet; run 'flask db upgrade'. "
+            "SQLite foreign keys stay off until then."
+        )
+
 @login_manager.user_loader
 def load_user(user_id):
     from app.models import User
@@ -37,6 +91,7 @@ def create_app():
     ckeditor.init_app(app)
     bootstrap.init_app(app)
     login_manager.init_app(app)
+    view_counter.init_app(app)
     app.jinja_env.filters['gravatar'] = gravatar_url    
     login_manager.login_view = "routes.login"
     # ckeditor.config(default:{"versionCheck"=False})
@@ -50,12 +105,36 @@ def create_app():
     app.logger.setLevel(logging.INFO)
     app.logger.info('App startup')
 
+    # Select the HTML sanitizer engine
+    from app.sanitizer import init_sanitizer
+    init_sanitizer(app)
+
     # Register routes blueprints
     from app.routes import routes_bp
     app.register_blueprint(routes_bp)
+    from app.sitemap import sitemap_bp
+    app.register_blueprint(sitemap_bp)
+
+    # Trending ranking maintenance commands
+    from app.trending import trending_cli
+    app.cli.add_command(trending_cli)
+
+    # Database benchmarks and sanitizer engine checks
+    from app.benchmarks import benchmark_cli, sanitizer_cli
+    app.cli.add_command(benchmark_cli)
+    app.cli.add_command(sanitizer_cli)
+
+    # CDN cache headers and purge hook
+    from app.http_cache import init_http_cache
+    init_http_cache(app)
+
+    # Compress and minify outgoing responses
+    from app.compression import init_compression
+    init_compression(app)
 
     # Create database tables
     with app.app_context():
         db.create_all()
+        configure_sqlite_foreign_keys(app)
 
     return app
@@ -0,0 +1,234 @@
+# benchmarks.py - Offline benchmarks and differential checks, run from the CLI.
+#
+# Database benchmarks run inside a transaction that is always rolled back.
+
+import time
+import uuid
+import click
+from html.parser import HTMLParser
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import insert, text
+from app import db, comments_fk_cascades
+from app.models import User, BlogPost, Comment
+from app.sanitizer import ENGINES, create_sanitizer
+
+benchmark_cli = AppGroup("benchmark", help="Run database benchmarks (changes are rolled back).")
+
+
+@benchmark_cli.command("delete-post")
+@click.option(
+    "--comments",
+    "comment_counts",
+    multiple=True,
+    type=int,
+    default=[0, 100, 1000, 10000],
+    show_default=True,
+    help="Comment counts to measure, repeatable.",
+)
+@click.option("--repeat", default=3, show_default=True, help="Deletes timed per comment count.")
+def delete_post_command(comment_counts, repeat):
+    """
+    Time deleting a post as its number of comments grows. The database
+    cascades to the comments within one statement; time still grows linearly
+    with the comment count, just far more cheaply than loading and deleting
+    each comment through the ORM.
+    """
+    # Without the cascade the DELETE leaves the comments behind, timing nothing useful
+    sqlite_fks_off = (
+        db.engine.dialect.name == "sqlite"
+        and not db.session.execute(text("PRAGMA foreign_keys")).scalar()
+    )
+    if not comments_fk_cascades() or sqlite_fks_off:
+        raise click.ClickException(
+            "Deleting a post does not cascade to its comments; run 'flask db upgrade' first."
+        )
+    try:
+        author = User(username="benchmark", email=f"{uuid.uuid4()}@benchmark.invalid", password="-")
+        db.session.add(author)
+        db.session.flush()
+        for count in comment_counts:
+            timings = []
+            for _ in range(repeat):
+                post = BlogPost(
+                    title=f"benchmark {uuid.uuid4()}",
+                    subtitle="benchmark",
+                    body="<p>benchmark</p>",
+                    img_url="https://example.com/benchmark.jpg",
+                    author=author,
+                )
+                db.session.add(post)
+                db.session.flush()
+                if count:
+                    db.session.execute(
+                        insert(Comment),
+                        [{"post_id": post.id, "author_id": author.id, "text": "benchmark"}] * count,
+                    )
+                db.session.expunge(post)
+
+                start = time.perf_counter()
+                BlogPost.delete_by_id(post.id)
+                timings.append(time.perf_counter() - start)
+            click.echo(f"{count:>7} comments: {min(timings) * 1000:8.2f} ms (best of {repeat})")
+    finally:
+        db.session.rollback()
+
+
+# Differential corpus of realistic CKEditor 4 output plus hostile input
+CORPUS = [
+    '<p>Hello <strong>world</strong>, this is <em>my</em> first <u>blob</u>.</p>',
+    '<h2>Getting started</h2>\n\n<p>Install the package:</p>\n\n<pre>\n<code class="language-bash">pip install -r requirements.txt\ncd Blobby &amp;&amp; flask run</code></pre>\n',
+    '<pre><code class="language-python">def f(x):\n    return x &lt; 2 and x &gt; 0\n</code></pre>',
+    '<p style="text-align:center"><img alt="Sunset" height="300" src="https://example.com/sunset.jpg" style="float:left" width="400" /></p>',
+    '<figure class="image"><img alt="a" src="a.jpg" /><figcaption>Caption</figcaption></figure>',
+    '<ol>\n\t<li>First</li>\n\t<li>Second\n\t<ul>\n\t\t<li>Nested</li>\n\t</ul>\n\t</li>\n</ol>\n',
+    '<blockquote>\n<p>&ldquo;Quoted&rdquo; text &mdash; with entities&nbsp;&amp; more</p>\n</blockquote>\n',
+    '<table border="1" cellpadding="1" cellspacing="1" style="width:500px">\n\t<caption>Stats</caption>\n\t<thead>\n\t\t<tr>\n\t\t\t<th scope="col">A</th>\n\t\t\t<th colspan="2">B</th>\n\t\t</tr>\n\t</thead>\n\t<tbody>\n\t\t<tr>\n\t\t\t<td rowspan="2" valign="top">1</td>\n\t\t\t<td align="right">2</td>\n\t\t</tr>\n\t</tbody>\n</table>\n',
+    '<p><a href="https://example.com" rel="noopener" target="_blank" title="Example">link</a> and <a href="mailto:me@example.com">mail</a></p>',
+    '<p><a href="javascript:alert(1)" onclick="steal()">bad link</a></p>',
+    '<p><a href="ftp://example.com/file">ftp</a> <a href="/relative/path">relative</a></p>',
+    '<img src="x.png" onerror="alert(1)" />',
+    '<script>alert("xss")</script><p>after script</p>',
+    '<style>body { display: none }</style><p>after style</p>',
+    '<iframe src="https://evil.example"></iframe><p>after iframe</p>',
+    '<p class="lead" id="intro" data-x="1">Classes and ids</p>',
+    '<!-- editor comment --><p>visible</p>',
+    '<p>unclosed <b>bold <i>italic',
+    '<div><span style="font-size:18px">Sized</span><br />\nline<hr /></div>',
+    '<h1>H1</h1><h3>H3</h3><h6>H6</h6><p>&copy; 2025 &#169; &#x27;apos&#39;</p>',
+    "<a href='x' title='a\"b'>quotes</a>",
+    'plain < text > with & ampersands',
+    '<p>Unicode: café, 日本語, emoji \U0001f600</p>',
+    '<p>Comment with a <code>inline_code()</code> call</p>',
+    '<pre>\n  indented\n\n    more  spaced</pre>',
+]
+
+# Samples where nh3 is known to differ from bleach, with the reason; both
+# outputs are safe, so these are reported but don't fail the comparison
+DIVERGENCES = {
+    '<p>a<svg><text>t</text></svg>b</p>': "ammonia drops foreign <svg> content, bleach keeps its text",
+    '<p>x <math><mi>y</mi></math></p>': "ammonia drops foreign <math> content, bleach keeps its text",
+    '<textarea><b>x</b></textarea>': "ammonia escapes raw-text <textarea> content, bleach keeps the tags",
+    '<noscript><p>hi</p></noscript>': "ammonia escapes raw-text <noscript> content, bleach keeps the tags",
+    '<xmp><b>x</b></xmp>': "ammonia escapes raw-text <xmp> content, bleach keeps the tags",
+    '<title><b>t</b></title>': "ammonia escapes raw-text <title> content, bleach keeps the tags",
+}
+CORPUS += list(DIVERGENCES)
+
+
+class _TokenCollector(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tokens = []
+        self.pre_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        self.tokens.append(("start", tag, tuple(sorted(attrs))))
+        if tag == "pre":
+            self.pre_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        self.tokens.append(("end", tag))
+        if tag == "pre" and self.pre_depth:
+            self.pre_depth -= 1
+
+    def handle_data(self, data):
+        # Whitespace inside <pre> is rendered, so it must match exactly
+        if self.pre_depth:
+            text, separator = data, ""
+        else:
+            text, separator = " ".join(data.split()), " "
+        if text:
+            # Merge adjacent text nodes split by entity boundaries
+            if self.tokens and self.tokens[-1][0] == "text":
+                self.tokens[-1] = ("text", self.tokens[-1][1] + separator + text)
+            else:
+                self.tokens.append(("text", text))
+
+
+def normalize_html(html):
+    """
+    Reduce HTML to a token stream so serialization-only differences
+    (entity spelling, attribute quoting, whitespace between elements) compare
+    equal. Text inside <pre> is kept verbatim.
+    """
+    collector = _TokenCollector()
+    collector.feed(html)
+    collector.close()
+    return collector.tokens
+
+
+def compare_engines(reference, candidate, corpus=CORPUS):
+    """
+    Return (sample, reference output, candidate output, reason) for every
+    sample that differs; reason is None unless the sample is in DIVERGENCES.
+    """
+    mismatches = []
+    for sample in corpus:
+        expected = reference.clean(sample)
+        actual = candidate.clean(sample)
+        if normalize_html(expected) != normalize_html(actual):
+            mismatches.append((sample, expected, actual, DIVERGENCES.get(sample)))
+    return mismatches
+
+
+def benchmark_engine(sanitizer, corpus=CORPUS, rounds=200):
+    """Return the throughput of an engine over the corpus in documents and MB per second."""
+    size = sum(len(sample.encode("utf-8")) for sample in corpus) * rounds
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for sample in corpus:
+            sanitizer.clean(sample)
+    elapsed = time.perf_counter() - start
+    return len(corpus) * rounds / elapsed, size / elapsed / 1e6
+
+
+sanitizer_cli = AppGroup("sanitizer", help="Check and benchmark HTML sanitizer engines.")
+
+
+def _engines_from_config():
+    tags = current_app.config["ALLOWED_TAGS"]
+    attributes = current_app.config["ALLOWED_ATTRIBUTES"]
+    engines = []
+    for name in ENGINES:
+        try:
+            engines.append(create_sanitizer(name, tags, attributes))
+        except RuntimeError as e:
+            click.echo(f"Skipping {name}: {e}")
+    return engines
+
+
+@sanitizer_cli.command("compare")
+def compare_command():
+    """Run the differential corpus through every engine against bleach; undeclared differences fail."""
+    reference, *candidates = _engines_from_config()
+    failed = False
+    for candidate in candidates:
+        mismatches = compare_engines(reference, candidate)
+        expected_count = sum(reason is not None for *_, reason in mismatches)
+        click.echo(
+            f"{candidate.name}: {len(CORPUS) - len(mismatches)}/{len(CORPUS)} equivalent, "
+            f"{expected_count} expected divergences"
+        )
+        for sample, expected, actual, reason in mismatches:
+            if reason is None:
+                failed = True
+                reason = "UNEXPECTED"
+            click.echo(
+                f"  input:    {sample!r} ({reason})\n"
+                f"  {reference.name}: {expected!r}\n  {candidate.name}: {actual!r}"
+            )
+    if failed:
+        raise SystemExit(1)
+
+
+@sanitizer_cli.command("bench")
+@click.option("--rounds", default=200, show_default=True, help="Passes over the corpus.")
+def bench_command(rounds):
+    """Measure sanitizer throughput on the CKEditor corpus."""
+    for sanitizer in _engines_from_config():
+        docs_per_sec, mb_per_sec = benchmark_engine(sanitizer, rounds=rounds)
+        click.echo(f"{sanitizer.name:>8}: {docs_per_sec:10.0f} docs/s {mb_per_sec:8.2f} MB/s")
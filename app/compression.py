@@ -0,0 +1,195 @@
+# compression.py - Response post-processing: HTML minification and gzip/brotli compression.
+
+import gzip
+import re
+import threading
+import time
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, fall back to gzip only
+    brotli = None
+
+
+# Blocks whose whitespace is significant and must be left untouched
+_PRESERVE_RE = re.compile(
+    r"(<(pre|code|textarea|script|style)\b[^>]*>.*?</\2\s*>)",
+    re.IGNORECASE | re.DOTALL,
+)
+# A whole tag, including quoted attribute values that may contain ">"
+_TAG_RE = re.compile(r"""(<(?:[^>"']|"[^"]*"|'[^']*')*>)""")
+# ASCII whitespace only: U+00A0 and other Unicode spaces are visible text
+_WHITESPACE_RE = re.compile(r"[ \t\r\n\f]+")
+_COMMENT_RE = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+
+
+def _collapse_text(html):
+    """Collapse whitespace runs in text nodes only; tags and their attributes pass through."""
+    parts = _TAG_RE.split(html)
+    # re.split with one group yields: text, tag, text, tag, ...
+    for i in range(0, len(parts), 2):
+        parts[i] = _WHITESPACE_RE.sub(" ", parts[i])
+    return "".join(parts)
+
+
+def minify_html(html):
+    """
+    Collapse insignificant whitespace and drop HTML comments, leaving
+    attribute values and <pre>, <code>, <textarea>, <script> and <style>
+    blocks as they are.
+    """
+    parts = _PRESERVE_RE.split(html)
+    out = []
+    # re.split with two groups yields: text, block, tag name, text, block, tag name, ...
+    for i in range(0, len(parts), 3):
+        text = _collapse_text(_COMMENT_RE.sub("", parts[i]))
+        out.append(text)
+        if i + 1 < len(parts):
+            out.append(parts[i + 1])
+    return "".join(out).strip()
+
+
+def choose_encoding(accept_encoding):
+    """
+    Pick the best supported content coding from an Accept-Encoding header.
+    Brotli is preferred over gzip when both are acceptable.
+    """
+    available = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for coding in available:
+        q = accept_encoding.quality(coding)
+        # Strictly greater, so ties keep the earlier (preferred) coding
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CompressionStats:
+    """
+    Thread-safe running totals of bytes before/after processing and CPU time
+    spent, used to tune COMPRESS_LEVEL / MINIFY_HTML.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._logged_at = time.monotonic()
+        self.reset()
+
+    def reset(self):
+        self.responses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def record(self, bytes_in, bytes_out, cpu_seconds):
+        with self._lock:
+            self.responses += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.cpu_seconds += cpu_seconds
+
+    def snapshot(self):
+        with self._lock:
+            ratio = self.bytes_out / self.bytes_in if self.bytes_in else 1.0
+            return {
+                "responses": self.responses,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "ratio": round(ratio, 4),
+                "cpu_ms": round(self.cpu_seconds * 1000, 3),
+            }
+
+    def log_if_due(self, logger, interval):
+        """Log the running totals at INFO at most once per interval seconds."""
+        with self._lock:
+            if time.monotonic() - self._logged_at < interval:
+                return
+            self._logged_at = time.monotonic()
+        logger.info("Compression stats: %s", self.snapshot())
+
+
+compression_stats = CompressionStats()
+
+# Compressed static files per worker, keyed by (path, last modified, encoding)
+_static_cache = {}
+
+
+def _compress(app, body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=app.config["COMPRESS_BROTLI_QUALITY"])
+    return gzip.compress(body, compresslevel=app.config["COMPRESS_LEVEL"], mtime=0)
+
+
+def init_compression(app):
+    """Register the response processing stage on the app."""
+
+    @app.after_request
+    def process_response(response):
+        # Static files are sent as file wrappers; they are compressed once and cached
+        is_static = response.direct_passthrough and request.endpoint == "static"
+        # Other streamed, already encoded, non-text or non-200 bodies pass through untouched
+        if (
+            response.status_code != 200
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in app.config["COMPRESS_MIMETYPES"]
+            or (response.is_streamed and not is_static)
+        ):
+            return response
+
+        start = time.thread_time()
+        encoding = None
+        if is_static:
+            bytes_in = response.content_length or 0
+            if app.config["COMPRESS_ENABLED"] and bytes_in >= app.config["COMPRESS_MIN_SIZE"]:
+                encoding = choose_encoding(request.accept_encodings)
+            if encoding:
+                key = (request.path, response.last_modified, encoding)
+                body = _static_cache.get(key)
+                if body is None:
+                    response.direct_passthrough = False
+                    body = _compress(app, response.get_data(), encoding)
+                    _static_cache[key] = body
+                response.close()
+                response.set_data(body)
+                bytes_out = len(body)
+            else:
+                bytes_out = bytes_in
+        else:
+            body = response.get_data()
+            bytes_in = len(body)
+
+            if app.config["MINIFY_HTML"] and response.mimetype == "text/html":
+                charset = response.mimetype_params.get("charset", "utf-8")
+                body = minify_html(body.decode(charset)).encode(charset)
+
+            if app.config["COMPRESS_ENABLED"] and len(body) >= app.config["COMPRESS_MIN_SIZE"]:
+                encoding = choose_encoding(request.accept_encodings)
+            if encoding:
+                body = _compress(app, body, encoding)
+            response.set_data(body)
+            bytes_out = len(body)
+
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+            # A strong validator must not be shared between encodings of the same file
+            etag, weak = response.get_etag()
+            if etag and not weak:
+                response.set_etag(etag, weak=True)
+        # The body depends on Accept-Encoding whenever compression is possible
+        if app.config["COMPRESS_ENABLED"]:
+            response.vary.add("Accept-Encoding")
+
+        cpu_seconds = time.thread_time() - start
+        compression_stats.record(bytes_in, bytes_out, cpu_seconds)
+        compression_stats.log_if_due(app.logger, app.config["COMPRESS_STATS_INTERVAL"])
+        app.logger.debug(
+            "%s %s: %d -> %d bytes (%s) in %.2f ms",
+            request.method,
+            request.path,
+            bytes_in,
+            bytes_out,
+            encoding or "identity",
+            cpu_seconds * 1000,
+        )
+        return response
@@ -0,0 +1,156 @@
+# http_cache.py - CDN-friendly HTTP caching: per-route policies, ETags, surrogate keys and purging.
+#
+# Routes opt in with @cache_policy. Anonymous responses then get a public
+# Cache-Control (s-maxage for the edge), Vary: Cookie so logged-in visitors
+# never receive a shared copy, and a surrogate-key header listing what the page
+# depends on. Write routes call purge() with the keys they invalidate.
+
+import hashlib
+import requests
+from functools import wraps
+from flask import current_app, g, request, session
+from flask_login import current_user
+
+# Surrogate keys
+LISTING = "listing"
+TRENDING = "trending"
+SITEMAP = "sitemap"
+
+
+def post_key(post_id):
+    return f"post-{post_id}"
+
+
+def author_key(user_id):
+    return f"author-{user_id}"
+
+
+def cache_policy(name):
+    """Apply the HTTP_CACHE_POLICIES entry `name` to anonymous responses of a view."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            g.cache_policy = current_app.config["HTTP_CACHE_POLICIES"][name]
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def add_surrogate_keys(*keys):
+    g.setdefault("surrogate_keys", set()).update(keys)
+
+
+def not_modified(*stamps):
+    """
+    Derive a weak ETag from update stamps and remember it for the response.
+    Returns True when the client already holds this version, so the view can
+    return an empty 304 without querying further or rendering.
+    """
+    # Logged-in pages differ per user, so the viewer is part of the version
+    digest = hashlib.sha1(repr((current_user.get_id(),) + stamps).encode()).hexdigest()
+    g.etag = digest[:32]
+    return request.method == "GET" and request.if_none_match.contains_weak(g.etag)
+
+
+def is_anonymous_response(response):
+    return (
+        not current_user.is_authenticated
+        and not session.modified
+        and "Set-Cookie" not in response.headers
+    )
+
+
+def apply_cache_headers(response):
+    policy = g.get("cache_policy")
+    if policy is None or request.method not in ("GET", "HEAD"):
+        return response
+
+    if getattr(g, "etag", None):
+        response.set_etag(g.etag, weak=True)
+    response.vary.add("Cookie")
+
+    if response.status_code in (200, 304) and is_anonymous_response(response):
+        response.cache_control.public = True
+        response.cache_control.max_age = policy["max_age"]
+        response.cache_control.s_maxage = policy["s_maxage"]
+        if policy.get("stale_while_revalidate"):
+            response.cache_control.stale_while_revalidate = policy["stale_while_revalidate"]
+        keys = g.get("surrogate_keys")
+        if keys:
+            response.headers[current_app.config["SURROGATE_KEY_HEADER"]] = " ".join(sorted(keys))
+    else:
+        # Personalised or cookie-setting responses must never be shared
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    return response
+
+
+class RecordingPurger:
+    """
+    Local stand-in that records every purge instead of calling a CDN, so
+    development and tests can check which keys each write invalidates.
+    """
+
+    name = "recording"
+
+    def __init__(self, app):
+        self.logger = app.logger
+        self.purged = []
+
+    def purge(self, keys):
+        self.purged.append(sorted(keys))
+        self.logger.info("Cache purge: %s", " ".join(sorted(keys)))
+
+
+class WebhookPurger:
+    """
+    Posts {"keys": [...]} to CACHE_PURGE_URL, e.g. a CDN purge-by-tag endpoint
+    or a small function that forwards to one.
+    """
+
+    name = "webhook"
+
+    def __init__(self, app):
+        self.logger = app.logger
+        self.url = app.config["CACHE_PURGE_URL"]
+        self.token = app.config["CACHE_PURGE_TOKEN"]
+        if not self.url:
+            raise ValueError("The webhook cache purger requires CACHE_PURGE_URL.")
+
+    def purge(self, keys):
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        try:
+            response = requests.post(
+                self.url, json={"keys": sorted(keys)}, headers=headers, timeout=5
+            )
+            response.raise_for_status()
+        except requests.RequestException:
+            # A failed purge only leaves pages stale until their s-maxage expires
+            self.logger.exception("Cache purge failed for %s", " ".join(sorted(keys)))
+
+
+PURGERS = {
+    RecordingPurger.name: RecordingPurger,
+    WebhookPurger.name: WebhookPurger,
+}
+
+
+def purge(*keys):
+    """Invalidate every cached response tagged with any of the given surrogate keys."""
+    if keys:
+        current_app.extensions["cache_purger"].purge(set(keys))
+
+
+def init_http_cache(app):
+    """Install the configured purger and the cache header hook."""
+    try:
+        purger_cls = PURGERS[app.config["CACHE_PURGER"]]
+    except KeyError:
+        raise ValueError(
+            f"Unknown cache purger {app.config['CACHE_PURGER']!r}, expected one of {sorted(PURGERS)}"
+        )
+    app.extensions["cache_purger"] = purger_cls(app)
+    app.after_request(apply_cache_headers)
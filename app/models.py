@@ -1,7 +1,7 @@
 from app import db
 from flask_login import UserMixin
 from sqlalchemy.orm import relationship
-from sqlalchemy import Integer, String, Text, DateTime
+from sqlalchemy import Integer, String, Text, DateTime, Float, delete
 from datetime import datetime, timezone
 
 
@@ -24,9 +24,23 @@ class BlogPost(db.Model):
     title = db.Column(String(255), unique=True, nullable=False)
     subtitle = db.Column(String(255), nullable=False)
     date = db.Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
     body = db.Column(Text, nullable=False)
     img_url = db.Column(String(255), nullable=False)
-    comments = relationship("Comment", back_populates="parent_post")
+    # Comments are removed by the database (ON DELETE CASCADE), never loaded for deletes
+    comments = relationship("Comment", back_populates="parent_post", passive_deletes=True)
+
+    @staticmethod
+    def delete_by_id(post_id):
+        """
+        Delete a post with a single statement. Its comments, view counts and
+        trending entry go with it through the foreign keys' ON DELETE CASCADE.
+        """
+        db.session.execute(delete(BlogPost).where(BlogPost.id == post_id))
 
 
 class Comment(db.Model):
@@ -34,7 +48,26 @@ class Comment(db.Model):
     id = db.Column(Integer, primary_key=True)
     author_id = db.Column(Integer, db.ForeignKey("users.id"))
     comment_author = relationship("User", back_populates="comments")
-    post_id = db.Column(Integer, db.ForeignKey("blog_posts.id"))
+    post_id = db.Column(
+        Integer, db.ForeignKey("blog_posts.id", ondelete="CASCADE"), index=True
+    )
     parent_post = relationship("BlogPost", back_populates="comments")
     text = db.Column(Text, nullable=False)
     date = db.Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class PostView(db.Model):
+    __tablename__ = "post_views"
+    post_id = db.Column(
+        Integer, db.ForeignKey("blog_posts.id", ondelete="CASCADE"), primary_key=True
+    )
+    views = db.Column(Integer, nullable=False, default=0)
+
+
+class TrendingPost(db.Model):
+    __tablename__ = "trending_posts"
+    post_id = db.Column(
+        Integer, db.ForeignKey("blog_posts.id", ondelete="CASCADE"), primary_key=True
+    )
+    # log2 of the time-decayed score, see app/trending.py
+    log_score = db.Column(Float, nullable=False, index=True)
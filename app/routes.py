@@ -7,25 +7,22 @@ from flask import (
     session,
     abort,
     request,
+    jsonify,
 )
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from app.models import User, BlogPost, Comment
 from app.forms import BlogPostForm, RegisterForm, LoginForm, CommentForm, ContactFrom
-from app import db
+from app import db, view_counter, trending, http_cache
+from app.http_cache import cache_policy, add_surrogate_keys, not_modified
 from flask import current_app
 from functools import wraps
-import bleach
 import resend
 
 
-# Sanitize content from User input
+# Sanitize content from User input with the configured engine
 def sanitize(text):
-    allowed_tags = current_app.config["ALLOWED_TAGS"]
-    allowed_attributes = current_app.config["ALLOWED_ATTRIBUTES"]
-    return bleach.clean(
-        text, tags=allowed_tags, attributes=allowed_attributes, strip=True
-    )
+    return current_app.extensions["sanitizer"].clean(text)
 
 
 # Create a Blueprint for routes
@@ -44,12 +41,13 @@ def admin_only(func):
     return wrapper
 
 
+# Author-only decorator, passes the loaded post on to the view
 def author_only(func):
     @wraps(func)
     def wrapper(post_id, *args, **kwargs):
         post = BlogPost.query.get_or_404(post_id)
-        if post.author == current_user:
-            return func(post_id, *args, **kwargs)
+        if post.author_id == current_user.id:
+            return func(post, *args, **kwargs)
         else:
             return abort(403)  # Forbidden
 
@@ -116,35 +114,83 @@ def logout():
     return redirect(url_for("routes.get_posts"))
 
 
+# ETag stamps for a list of posts: what each preview shows and when it last changed
+def listing_stamps(posts):
+    return [(post.id, post.updated_at, post.author.username) for post in posts]
+
+
 # Display Newest 10 posts
 @routes_bp.route("/")
+@cache_policy("listing")
 def get_posts():
     posts = BlogPost.query.limit(10).all()
-    return render_template("index.html", posts=posts)
+    trending_posts = trending.top_posts(current_app.config["TRENDING_LIMIT"])
+    add_surrogate_keys(http_cache.LISTING, http_cache.TRENDING)
+    if not_modified(listing_stamps(posts), [post.id for post in trending_posts]):
+        return "", 304
+    view_counts = view_counter.counts(post.id for post in posts + trending_posts)
+    return render_template(
+        "index.html",
+        posts=posts,
+        trending_posts=trending_posts,
+        view_counts=view_counts,
+    )
 
 
 # Display all posts
 @routes_bp.route("/all_posts")
+@cache_policy("listing")
 def show_all_posts():
     posts = BlogPost.query.all()
-    return render_template("all-posts.html", all_posts=posts)
+    add_surrogate_keys(http_cache.LISTING)
+    if not_modified(listing_stamps(posts)):
+        return "", 304
+    view_counts = view_counter.counts(post.id for post in posts)
+    return render_template("all-posts.html", all_posts=posts, view_counts=view_counts)
 
 
 # Show individual post
 @routes_bp.route("/post/<int:post_id>", methods=["GET", "POST"])
+@cache_policy("post")
 def show_post(post_id):
     post = BlogPost.query.get_or_404(post_id)
-    form = CommentForm()
-    if form.validate_on_submit() and current_user.is_authenticated:
+    # Building the form stores a CSRF token in the session, which would make
+    # the anonymous page set a cookie and so be uncacheable
+    form = None
+    if current_user.is_authenticated or request.method == "POST":
+        form = CommentForm()
+    if form and form.validate_on_submit() and current_user.is_authenticated:
         comment = Comment(
             text=sanitize(form.comment_text.data),
             comment_author=current_user,
             parent_post=post,
         )
         db.session.add(comment)
+        trending.record_comment(post.id)
         db.session.commit()
+        http_cache.purge(http_cache.post_key(post.id), http_cache.TRENDING)
         return redirect(url_for("routes.show_post", post_id=post.id))
 
+    # Views are counted by the uncached beacon below, since the CDN serves
+    # most hits on this page without reaching the app
+    # Comments show their author's name and gravatar, so a commenter editing
+    # their account changes this page too
+    commenters = db.session.execute(
+        db.select(Comment.id, Comment.author_id, User.username, User.email)
+        .outerjoin(User, User.id == Comment.author_id)
+        .where(Comment.post_id == post.id)
+        .order_by(Comment.id)
+    ).tuples().all()
+    add_surrogate_keys(
+        http_cache.post_key(post.id),
+        http_cache.author_key(post.author_id),
+        *(http_cache.author_key(author_id) for _, author_id, _, _ in commenters if author_id),
+    )
+    if not_modified(post.id, post.updated_at, post.author.username, commenters):
+        return "", 304
+
+    views = view_counter.counts([post.id])[post.id]
+
     sanitized_post_body = sanitize(post.body)
     sanitized_comments_text = [sanitize(comment.text) for comment in post.comments]
     comments_with_sanitized_text = zip(post.comments, sanitized_comments_text)
@@ -154,9 +200,21 @@ def show_post(post_id):
         form=form,
         sanitized_post_body=sanitized_post_body,
         comments_with_sanitized_text=comments_with_sanitized_text,
+        views=views,
     )
 
 
+# View beacon, posted by post.html on every page load
+@routes_bp.route("/post/<int:post_id>/view", methods=["POST"])
+def count_view(post_id):
+    post = BlogPost.query.get_or_404(post_id)
+    # Buffered in memory and flushed in batches, never written on this path
+    view_counter.increment(post.id)
+    response = jsonify(views=view_counter.counts([post.id])[post.id])
+    response.cache_control.no_store = True
+    return response
+
+
 # Add a new post
 @routes_bp.route("/new-post", methods=["GET", "POST"])
 @login_required
@@ -172,6 +230,9 @@ def add_new_post():
         )
         db.session.add(new_post)
         db.session.commit()
+        http_cache.purge(
+            http_cache.LISTING, http_cache.SITEMAP, http_cache.author_key(current_user.id)
+        )
         return redirect(url_for("routes.get_posts"))
     return render_template("make-post.html", form=form)
 
@@ -180,8 +241,7 @@ def add_new_post():
 @routes_bp.route("/edit-post/<int:post_id>", methods=["GET", "POST"])
 @login_required
 @author_only
-def edit_post(post_id):
-    post = BlogPost.query.get_or_404(post_id)
+def edit_post(post):
     form = BlogPostForm(obj=post)
     if form.validate_on_submit():
         post.title = form.title.data
@@ -189,6 +249,13 @@ def edit_post(post_id):
         post.body = sanitize(form.body.data)
         post.img_url = form.img_url.data
         db.session.commit()
+        http_cache.purge(
+            http_cache.post_key(post.id),
+            http_cache.LISTING,
+            http_cache.TRENDING,
+            http_cache.SITEMAP,
+            http_cache.author_key(post.author_id),
+        )
         return redirect(url_for("routes.show_post", post_id=post.id))
     return render_template("make-post.html", form=form, is_edit=True)
 
@@ -197,21 +264,29 @@ def edit_post(post_id):
 @routes_bp.route("/delete/<int:post_id>")
 @login_required
 @author_only
-def delete_post(post_id):
-    post = BlogPost.query.get_or_404(post_id)
-    db.session.delete(post)
+def delete_post(post):
+    BlogPost.delete_by_id(post.id)
     db.session.commit()
+    http_cache.purge(
+        http_cache.post_key(post.id),
+        http_cache.LISTING,
+        http_cache.TRENDING,
+        http_cache.SITEMAP,
+        http_cache.author_key(post.author_id),
+    )
     return redirect(url_for("routes.get_posts"))
 
 
 # About page
 @routes_bp.route("/about")
+@cache_policy("static_page")
 def about():
     return render_template("about.html")
 
 
 # Contact page
 @routes_bp.route("/contact", methods=["GET", "POST"])
+@cache_policy("static_page")
 def contact():
     # Load the RESEND API KEY from app
     resend.api_key = current_app.config["RESEND_API_KEY"]
@@ -245,18 +320,24 @@ def contact():
 
 # Account page
 @routes_bp.route("/account/<int:user_id>")
+@cache_policy("account")
 def account(user_id):
     # Get the current user's posts sorted in descending order of date
     user = User.query.get(user_id)
     if not user:
         abort(404)
     posts = BlogPost.query.filter_by(author=user).all()
+    add_surrogate_keys(http_cache.author_key(user.id))
+    if not_modified(user.username, user.email, listing_stamps(posts)):
+        return "", 304
+    view_counts = view_counter.counts(post.id for post in posts)
 
     # Render the account page with user information and their posts
     return render_template(
         "account.html",
         user=user,
         posts=posts,
+        view_counts=view_counts,
     )
 
 
@@ -286,6 +367,8 @@ def edit_account():
 
         try:
             db.session.commit()
+            # Usernames appear on the author's posts, account page and listings
+            http_cache.purge(http_cache.author_key(current_user.id), http_cache.LISTING)
             flash("Account information updated successfully!", "success")
             return redirect(url_for("routes.account"))
         except Exception as e:
@@ -0,0 +1,92 @@
+# sanitizer.py - Pluggable HTML sanitizer engines used by routes.sanitize.
+
+import bleach
+
+try:
+    import nh3
+except ImportError:  # nh3 is optional, bleach stays available as the reference
+    nh3 = None
+
+
+# Only these URL schemes survive in href/src, matching bleach's defaults
+ALLOWED_PROTOCOLS = {"http", "https", "mailto"}
+
+
+class BleachSanitizer:
+    """
+    Reference engine: pure Python bleach.clean with strip=True.
+    """
+
+    name = "bleach"
+
+    def __init__(self, tags, attributes):
+        self.tags = list(tags)
+        self.attributes = {tag: list(attrs) for tag, attrs in attributes.items()}
+
+    def clean(self, text):
+        return bleach.clean(
+            text,
+            tags=self.tags,
+            attributes=self.attributes,
+            protocols=ALLOWED_PROTOCOLS,
+            strip=True,
+        )
+
+
+class Nh3Sanitizer:
+    """
+    Fast engine backed by nh3 (Rust ammonia) enforcing the same tag/attribute
+    policy as the bleach engine: disallowed tags are stripped but their text kept,
+    no rel is injected on links and only ALLOWED_PROTOCOLS are accepted in URLs.
+    Known divergences, all declared in benchmarks.DIVERGENCES: ammonia drops
+    <svg>/<math> subtrees where bleach keeps their text, and escapes the markup
+    inside raw-text elements such as <textarea>, <noscript>, <xmp> and <title>
+    where bleach keeps it as tags.
+    """
+
+    name = "nh3"
+
+    def __init__(self, tags, attributes):
+        if nh3 is None:
+            raise RuntimeError("The nh3 sanitizer engine requires the 'nh3' package.")
+        self.tags = set(tags)
+        self.attributes = {tag: set(attrs) for tag, attrs in attributes.items()}
+
+    def clean(self, text):
+        return nh3.clean(
+            text,
+            tags=self.tags,
+            attributes=self.attributes,
+            clean_content_tags=set(),
+            link_rel=None,
+            url_schemes=ALLOWED_PROTOCOLS,
+        )
+
+
+ENGINES = {
+    BleachSanitizer.name: BleachSanitizer,
+    Nh3Sanitizer.name: Nh3Sanitizer,
+}
+
+
+def create_sanitizer(engine, tags, attributes):
+    """Build the sanitizer engine registered under the given name."""
+    try:
+        engine_cls = ENGINES[engine]
+    except KeyError:
+        raise ValueError(
+            f"Unknown sanitizer engine {engine!r}, expected one of {sorted(ENGINES)}"
+        )
+    return engine_cls(tags, attributes)
+
+
+def init_sanitizer(app):
+    """Attach the configured sanitizer engine to the app."""
+    engine = app.config["SANITIZER_ENGINE"]
+    if engine == Nh3Sanitizer.name and nh3 is None:
+        app.logger.warning("nh3 is not installed, falling back to the bleach sanitizer")
+        engine = BleachSanitizer.name
+    app.extensions["sanitizer"] = create_sanitizer(
+        engine, app.config["ALLOWED_TAGS"], app.config["ALLOWED_ATTRIBUTES"]
+    )
+
@@ -0,0 +1,137 @@
+# sitemap.py - Sharded sitemap index and shards for posts and author pages.
+#
+# Shards are streamed row by row from a database cursor, so memory stays
+# constant however large they get, and each shard holds at most
+# SITEMAP_MAX_URLS (the protocol limit is 50,000). Nothing is cached in the
+# worker: the CDN caches the responses under the "sitemap" surrogate key, which
+# every post write purges, so all workers and the edge agree after a write.
+
+from datetime import timezone
+from xml.sax.saxutils import escape
+from flask import Blueprint, Response, abort, current_app, stream_with_context, url_for
+from sqlalchemy import func, select
+from app import db
+from app.http_cache import SITEMAP, add_surrogate_keys, cache_policy
+from app.models import BlogPost
+
+sitemap_bp = Blueprint("sitemap", __name__)
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+
+def _lastmod(date):
+    if date is None:
+        return ""
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return f"<lastmod>{date.astimezone(timezone.utc).isoformat(timespec='seconds')}</lastmod>"
+
+
+def _url_entry(tag, loc, date):
+    return f"<{tag}><loc>{escape(loc)}</loc>{_lastmod(date)}</{tag}>\n"
+
+
+def _sitemap_response(generate):
+    add_surrogate_keys(SITEMAP)
+    return Response(stream_with_context(generate()), mimetype="application/xml")
+
+
+def _post_keys():
+    return select(BlogPost.id.label("key"))
+
+
+def _author_keys():
+    return select(BlogPost.author_id.label("key")).where(BlogPost.author_id.is_not(None)).distinct()
+
+
+def _shard_bounds(keys):
+    """
+    Return the last key of every full shard, in order. Shard n then covers
+    keys greater than bounds[n - 2], so each shard is an indexed range scan
+    rather than an OFFSET over all earlier rows. len(bounds) + 1 shards exist
+    when the last one is partial.
+    """
+    per_shard = current_app.config["SITEMAP_MAX_URLS"]
+    keys = keys.subquery()
+    numbered = select(
+        keys.c.key, func.row_number().over(order_by=keys.c.key).label("row")
+    ).subquery()
+    bounds = db.session.scalars(
+        select(numbered.c.key).where(numbered.c.row % per_shard == 0).order_by(numbered.c.key)
+    ).all()
+    total = db.session.scalar(select(func.count()).select_from(keys))
+    return bounds, max(1, -(-total // per_shard))
+
+
+def _shard_range(keys, page):
+    """Return the exclusive lower key bound for a shard, or 404 if it doesn't exist."""
+    bounds, shard_count = _shard_bounds(keys)
+    if not 1 <= page <= shard_count:
+        abort(404)
+    return bounds[page - 2] if page > 1 else None
+
+
+def _stream_rows(stmt):
+    stmt = stmt.limit(current_app.config["SITEMAP_MAX_URLS"])
+    # yield_per streams from a server-side cursor instead of buffering every row
+    return db.session.execute(stmt.execution_options(yield_per=1000))
+
+
+@sitemap_bp.route("/sitemap.xml")
+@cache_policy("sitemap")
+def sitemap_index():
+    def generate():
+        _, post_shards = _shard_bounds(_post_keys())
+        _, author_shards = _shard_bounds(_author_keys())
+        yield XML_HEADER + f'<sitemapindex xmlns="{SITEMAP_NS}">\n'
+        for page in range(1, post_shards + 1):
+            loc = url_for("sitemap.posts_sitemap", page=page, _external=True)
+            yield _url_entry("sitemap", loc, None)
+        for page in range(1, author_shards + 1):
+            loc = url_for("sitemap.authors_sitemap", page=page, _external=True)
+            yield _url_entry("sitemap", loc, None)
+        yield "</sitemapindex>\n"
+
+    return _sitemap_response(generate)
+
+
+@sitemap_bp.route("/sitemap-posts-<int:page>.xml")
+@cache_policy("sitemap")
+def posts_sitemap(page):
+    after = _shard_range(_post_keys(), page)
+
+    def generate():
+        stmt = select(BlogPost.id, BlogPost.date).order_by(BlogPost.id)
+        if after is not None:
+            stmt = stmt.where(BlogPost.id > after)
+        yield XML_HEADER + f'<urlset xmlns="{SITEMAP_NS}">\n'
+        for post_id, date in _stream_rows(stmt):
+            loc = url_for("routes.show_post", post_id=post_id, _external=True)
+            yield _url_entry("url", loc, date)
+        yield "</urlset>\n"
+
+    return _sitemap_response(generate)
+
+
+@sitemap_bp.route("/sitemap-authors-<int:page>.xml")
+@cache_policy("sitemap")
+def authors_sitemap(page):
+    after = _shard_range(_author_keys(), page)
+
+    def generate():
+        stmt = (
+            select(BlogPost.author_id, func.max(BlogPost.date))
+            .where(BlogPost.author_id.is_not(None))
+            .group_by(BlogPost.author_id)
+            .order_by(BlogPost.author_id)
+        )
+        if after is not None:
+            stmt = stmt.where(BlogPost.author_id > after)
+        yield XML_HEADER + f'<urlset xmlns="{SITEMAP_NS}">\n'
+        for author_id, last_post_date in _stream_rows(stmt):
+            loc = url_for("routes.account", user_id=author_id, _external=True)
+            yield _url_entry("url", loc, last_post_date)
+        yield "</urlset>\n"
+
+    return _sitemap_response(generate)
@@ -0,0 +1,135 @@
+# trending.py - Incrementally maintained "trending posts" ranking.
+#
+# Each post's score is a sum of event weights decayed exponentially with a
+# half-life of TRENDING_HALF_LIFE hours. Instead of re-decaying every row as
+# time passes, events are scaled *up* by 2^((t - EPOCH) / half_life) and the
+# score is stored as a log2 so it never overflows. Relative order is then
+# independent of "now": reading the top N is a plain indexed
+# ORDER BY log_score DESC LIMIT N, and only stale rows need periodic pruning.
+
+import math
+import threading
+import time
+import click
+from datetime import datetime, timezone
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+
+# Fixed reference point for the log-space scores, never change once deployed
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+_last_prune = 0.0
+_prune_lock = threading.Lock()
+
+
+def _log_weight(weight, when):
+    """log2 of an event weight scaled to its occurrence time."""
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    half_life = current_app.config["TRENDING_HALF_LIFE"] * 3600
+    return math.log2(weight) + (when - EPOCH).total_seconds() / half_life
+
+
+def _log_add(a, b):
+    """log2(2^a + 2^b) without leaving log space."""
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def _bump(post_id, log_weight):
+    from app import db
+    from app.models import TrendingPost
+
+    entry = db.session.get(TrendingPost, post_id, with_for_update=True)
+    if entry is None:
+        try:
+            # Savepoint so a concurrent first insert doesn't abort the caller's transaction
+            with db.session.begin_nested():
+                db.session.add(TrendingPost(post_id=post_id, log_score=log_weight))
+            return
+        except IntegrityError:
+            entry = db.session.get(
+                TrendingPost, post_id, with_for_update=True, populate_existing=True
+            )
+    entry.log_score = _log_add(entry.log_score, log_weight)
+
+
+def record_comment(post_id, when=None):
+    """Add a comment to the ranking; flushed with the caller's transaction."""
+    when = when or datetime.now(timezone.utc)
+    _bump(post_id, _log_weight(current_app.config["TRENDING_COMMENT_WEIGHT"], when))
+
+
+def record_views(view_counts, when=None):
+    """Add a batch of {post_id: views} to the ranking; flushed with the caller's transaction."""
+    when = when or datetime.now(timezone.utc)
+    weight = current_app.config["TRENDING_VIEW_WEIGHT"]
+    for post_id, views in sorted(view_counts.items()):
+        _bump(post_id, _log_weight(weight * views, when))
+
+
+def top_posts(limit=5):
+    """Return the top trending BlogPosts, best first."""
+    from app import db
+    from app.models import BlogPost, TrendingPost
+
+    return db.session.scalars(
+        select(BlogPost)
+        .join(TrendingPost, TrendingPost.post_id == BlogPost.id)
+        .order_by(TrendingPost.log_score.desc())
+        .limit(limit)
+    ).all()
+
+
+def prune(now=None):
+    """
+    Re-decay the ranking by deleting posts whose score has fallen below
+    TRENDING_MIN_SCORE as of now. Returns the number of rows removed.
+    """
+    from app import db
+    from app.models import TrendingPost
+
+    now = now or datetime.now(timezone.utc)
+    cutoff = _log_weight(current_app.config["TRENDING_MIN_SCORE"], now)
+    result = db.session.execute(delete(TrendingPost).where(TrendingPost.log_score < cutoff))
+    db.session.commit()
+    return result.rowcount
+
+
+def maybe_prune():
+    """Prune at most once per TRENDING_PRUNE_INTERVAL seconds in this worker."""
+    global _last_prune
+    with _prune_lock:
+        if time.monotonic() - _last_prune < current_app.config["TRENDING_PRUNE_INTERVAL"]:
+            return
+        _last_prune = time.monotonic()
+    prune()
+
+
+trending_cli = AppGroup("trending", help="Maintain the trending posts ranking.")
+
+
+@trending_cli.command("rebuild")
+def rebuild_command():
+    """Rebuild the ranking from existing comments, e.g. after first deploy."""
+    from app import db
+    from app.models import Comment, TrendingPost
+
+    db.session.execute(delete(TrendingPost))
+    comments = db.session.execute(
+        select(Comment.post_id, Comment.date).where(Comment.post_id.is_not(None))
+    )
+    for post_id, date in comments:
+        record_comment(post_id, date or datetime.now(timezone.utc))
+    db.session.commit()
+    removed = prune()
+    total = db.session.scalar(select(func.count()).select_from(TrendingPost))
+    click.echo(f"Ranked {total} posts ({removed} below TRENDING_MIN_SCORE dropped).")
+
+
+@trending_cli.command("prune")
+def prune_command():
+    """Drop posts whose score has decayed below TRENDING_MIN_SCORE."""
+    click.echo(f"Removed {prune()} stale posts.")
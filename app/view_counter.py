@@ -0,0 +1,147 @@
+# view_counter.py - Write-behind post view counting.
+#
+# Views are aggregated in memory per worker and flushed by a background thread
+# as one batched upsert into post_views, so the view beacon never writes.
+# Serverless platforms may freeze the process between requests (stopping the
+# thread) or kill it without running atexit, so a due flush is also run after a
+# response has been sent. A crashed worker loses at most the views buffered
+# since its last flush.
+
+import atexit
+import os
+import threading
+import time
+from collections import Counter
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from app import trending
+
+
+class ViewCounter:
+    """
+    Buffers per-post view increments and periodically flushes them to the
+    post_views counters table.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._last_flush = time.monotonic()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config["VIEW_COUNT_FLUSH_INTERVAL"]
+        app.extensions["view_counter"] = self
+        atexit.register(self.flush)
+
+        @app.after_request
+        def flush_when_due(response):
+            # Runs once the response is closed, i.e. after it reached the client
+            if self._pending and time.monotonic() - self._last_flush >= self.interval:
+                response.call_on_close(self.flush)
+            return response
+
+    def increment(self, post_id, amount=1):
+        """Record views in memory; never touches the database."""
+        with self._lock:
+            self._pending[post_id] += amount
+        self._ensure_flusher()
+
+    def counts(self, post_ids):
+        """
+        Return {post_id: views} for the given posts, combining the persisted
+        counters with views still buffered in this worker.
+        """
+        from app import db
+        from app.models import PostView
+
+        post_ids = list(post_ids)
+        if not post_ids:
+            return {}
+        rows = db.session.execute(
+            select(PostView.post_id, PostView.views).where(PostView.post_id.in_(post_ids))
+        )
+        totals = dict.fromkeys(post_ids, 0)
+        totals.update(rows.tuples().all())
+        with self._lock:
+            for post_id in post_ids:
+                totals[post_id] += self._pending.get(post_id, 0)
+        return totals
+
+    def flush(self):
+        """Write buffered increments to the database in a single batched upsert."""
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        if not batch or self.app is None:
+            return
+        with self.app.app_context():
+            try:
+                self._upsert(batch)
+            except Exception:
+                self.app.logger.exception("Failed to flush %d post view counters", len(batch))
+                # Put the views back so a transient failure is retried next interval
+                with self._lock:
+                    self._pending.update(batch)
+                return
+
+            # The batch is committed by now, so a failed prune must not re-queue it
+            try:
+                trending.maybe_prune()
+            except Exception:
+                self.app.logger.exception("Failed to prune trending posts")
+
+    def _upsert(self, batch):
+        from app import db
+        from app.models import BlogPost, PostView
+
+        # Skip posts deleted since they were viewed
+        existing = db.session.scalars(
+            select(BlogPost.id).where(BlogPost.id.in_(batch.keys()))
+        ).all()
+        rows = [{"post_id": post_id, "views": batch[post_id]} for post_id in existing]
+        if not rows:
+            return
+
+        dialect = db.engine.dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = insert(PostView).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[PostView.post_id],
+                set_={"views": PostView.views + stmt.excluded.views},
+            )
+            db.session.execute(stmt)
+        else:
+            # Portable fallback for databases without ON CONFLICT
+            for row in rows:
+                view = db.session.get(PostView, row["post_id"], with_for_update=True)
+                if view is None:
+                    db.session.add(PostView(**row))
+                else:
+                    view.views += row["views"]
+        trending.record_views({row["post_id"]: row["views"] for row in rows})
+        db.session.commit()
+
+    def _ensure_flusher(self):
+        # Started lazily so each forked worker (e.g. gunicorn) gets its own thread
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="view-counter-flush", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
@@ -14,6 +14,49 @@ class Config:
     RESEND_SENDER = os.environ.get("RESEND_SENDER")
     RESEND_RECEIVER = os.environ.get("RESEND_RECEIVER")
 
+    # Response compression and HTML minification
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 500  # bytes, smaller bodies are sent as-is
+    COMPRESS_LEVEL = 6  # gzip level 1-9
+    COMPRESS_BROTLI_QUALITY = 4  # brotli quality 0-11
+    COMPRESS_MIMETYPES = [
+        'text/html', 'text/css', 'text/plain', 'text/xml', 'application/xml',
+        'application/json', 'text/javascript', 'application/javascript'
+    ]
+    MINIFY_HTML = True
+    COMPRESS_STATS_INTERVAL = 300  # seconds between INFO logs of compression totals
+
+    # Seconds between batched flushes of buffered post view counts
+    VIEW_COUNT_FLUSH_INTERVAL = int(os.environ.get("VIEW_COUNT_FLUSH_INTERVAL", 30))
+
+    # Trending posts ranking: decay half-life in hours and per-event weights
+    TRENDING_HALF_LIFE = 24
+    TRENDING_COMMENT_WEIGHT = 5
+    TRENDING_VIEW_WEIGHT = 1
+    TRENDING_MIN_SCORE = 0.5  # posts decayed below this are pruned
+    TRENDING_PRUNE_INTERVAL = 3600  # seconds
+    TRENDING_LIMIT = 5
+
+    # Sitemaps: URLs per shard (protocol max 50,000)
+    SITEMAP_MAX_URLS = 50000
+
+    # HTTP caching for anonymous responses (seconds); s_maxage applies to the CDN
+    HTTP_CACHE_POLICIES = {
+        'listing': {'max_age': 0, 's_maxage': 60, 'stale_while_revalidate': 300},
+        'post': {'max_age': 0, 's_maxage': 300, 'stale_while_revalidate': 600},
+        'account': {'max_age': 0, 's_maxage': 300, 'stale_while_revalidate': 600},
+        'static_page': {'max_age': 300, 's_maxage': 86400},
+        'sitemap': {'max_age': 3600, 's_maxage': 3600},
+    }
+    SURROGATE_KEY_HEADER = os.environ.get("SURROGATE_KEY_HEADER", "Surrogate-Key")
+    # Cache purger: "recording" (local stand-in) or "webhook" (POSTs keys to CACHE_PURGE_URL)
+    CACHE_PURGER = os.environ.get("CACHE_PURGER", "recording")
+    CACHE_PURGE_URL = os.environ.get("CACHE_PURGE_URL")
+    CACHE_PURGE_TOKEN = os.environ.get("CACHE_PURGE_TOKEN")
+
+    # HTML sanitizer engine: "nh3" (fast) or "bleach" (reference)
+    SANITIZER_ENGINE = os.environ.get("SANITIZER_ENGINE", "nh3")
+
     # Allowed tags and attributes for sanitization
     ALLOWED_TAGS = [
         'b', 'i', 'u', 'a', 'p', 'ul', 'ol', 'li', 'strong', 'em', 'img', 'table', 'tr', 'td',
@@ -97,6 +97,13 @@ def run_migrations_online():
     connectable = get_engine()
 
     with connectable.connect() as connection:
+        if connection.dialect.name == 'sqlite':
+            # Batch mode recreates tables with DROP TABLE, which would fire
+            # ON DELETE CASCADE if foreign keys were enforced. The pragma is a
+            # no-op inside a transaction, so commit it before migrating.
+            connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+            connection.commit()
+
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
@@ -0,0 +1,58 @@
+"""Cascade comment deletes with posts, index comments.post_id
+
+Revision ID: e4a19d6c5b73
+Revises: c71e5b08d2a4
+Create Date: 2026-10-19 14:02:57.130846
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a19d6c5b73'
+down_revision = 'c71e5b08d2a4'
+branch_labels = None
+depends_on = None
+
+# The baseline FK was created by db.create_all() without a name. PostgreSQL
+# names it comments_post_id_fkey; SQLite leaves it unnamed, so batch mode
+# needs a naming convention to be able to address it.
+NAMING_CONVENTION = {
+    "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
+}
+FK_NAME = 'comments_post_id_fkey'
+
+
+def _post_id_fk():
+    for fk in sa.inspect(op.get_bind()).get_foreign_keys('comments'):
+        if fk['constrained_columns'] == ['post_id']:
+            return fk
+    return None
+
+
+def _has_post_id_index():
+    indexes = sa.inspect(op.get_bind()).get_indexes('comments')
+    return any(index['column_names'] == ['post_id'] for index in indexes)
+
+
+def upgrade():
+    fk = _post_id_fk()
+    with op.batch_alter_table('comments', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        if not _has_post_id_index():
+            batch_op.create_index(batch_op.f('ix_comments_post_id'), ['post_id'], unique=False)
+        if fk is not None and fk['options'].get('ondelete', '').upper() != 'CASCADE':
+            batch_op.drop_constraint(fk['name'] or 'fk_comments_post_id_blog_posts', type_='foreignkey')
+            fk = None
+        if fk is None:
+            batch_op.create_foreign_key(FK_NAME, 'blog_posts', ['post_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade():
+    fk = _post_id_fk()
+    with op.batch_alter_table('comments', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        if fk is not None:
+            batch_op.drop_constraint(fk['name'] or 'fk_comments_post_id_blog_posts', type_='foreignkey')
+        batch_op.create_foreign_key(FK_NAME, 'blog_posts', ['post_id'], ['id'])
+        if _has_post_id_index():
+            batch_op.drop_index(batch_op.f('ix_comments_post_id'))